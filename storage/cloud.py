@@ -3,6 +3,7 @@ import datetime
 import logging
 import threading
 from io import FileIO
+from concurrent.futures import ThreadPoolExecutor
 from abc import ABC
 from .base import StorageObject, StoragePrefixBase, StorageIOSeekable
 logger = logging.getLogger(__name__)
@@ -104,6 +105,16 @@ class CloudStoragePrefix(StoragePrefixBase, ABC):
 
 
 class CloudStorageIO(StorageIOSeekable):
+    # Buffer size for the buffered IO of the cloud storage file.
+    # Each buffered read sends a request, larger buffer reduces the number of requests.
+    BUFFER_SIZE = int(os.environ.get("ARIES_CLOUD_BUFFER_SIZE", 8 * 1024 * 1024))
+
+    # Indicates if the next range of bytes should be downloaded in the background while reading the file.
+    # Sub-class should enable this only if read_bytes() can be called from another thread.
+    PREFETCH = False
+    # Thread pool for downloading the prefetched bytes, shared by all files.
+    prefetch_executor = ThreadPoolExecutor(max_workers=2)
+
     def __init__(self, uri):
         """
         """
@@ -116,26 +127,33 @@ class CloudStorageIO(StorageIOSeekable):
         self.__file_io = None
 
         # Cache the size information
-        # TODO: use cached property
+        # The cached size is cleared when the file is modified.
         self.__size = None
 
+        # The prefetched range as a 3-tuple (start, end, future)
+        self.__prefetch = None
+        # The position following the last range read from the cloud, for detecting sequential reads.
+        self.__read_position = 0
+
     @property
     def size(self):
-        if not self.__size:
-            if self.__file_io:
-                return os.fstat(self.__file_io.fileno).st_size
+        if self.__file_io:
+            return os.fstat(self.__file_io.fileno()).st_size
+        if self.__size is None:
             self.__size = self.get_size()
         return self.__size
 
     def seek(self, pos, whence=0):
         if self.__file_io:
+            if whence == 1:
+                # The position of the temp file is not moved by os.pwrite() in write(),
+                # the relative position is resolved with the tracked offset.
+                pos, whence = self._offset + pos, 0
             self._offset = self.__file_io.seek(pos, whence)
             return self._offset
         return self._seek(pos, whence)
 
     def tell(self):
-        if self.__file_io:
-            self._offset = self.__file_io.tell()
         return self._offset
 
     def local(self):
@@ -144,8 +162,8 @@ class CloudStorageIO(StorageIOSeekable):
         if not self.__file_io:
             file_obj = self.create_temp_file()
             # Download file if appending or updating
-            if self.exists() and ('a' in self.mode or '+' in self.mode):
-                self.download(file_obj)
+            if 'a' in self.mode or '+' in self.mode:
+                self.download_if_exists(file_obj)
             # Close the temp file and open it with FileIO
             file_obj.close()
             mode = "".join([c for c in self.mode if c in "rw+ax"])
@@ -163,8 +181,11 @@ class CloudStorageIO(StorageIOSeekable):
             self.__file_io.seek(start)
             b = self.__file_io.read(size)
         else:
-            if not self.exists():
-                raise FileNotFoundError("File %s does not exists." % self.uri)
+            # The file existed when the size was cached.
+            if self.__size is None:
+                self.__size = self.get_size_if_exists()
+                if self.__size is None:
+                    raise FileNotFoundError("File %s does not exists." % self.uri)
             file_size = self.size
             # TODO: size unknown?
             if not file_size:
@@ -177,10 +198,48 @@ class CloudStorageIO(StorageIOSeekable):
             if end > file_size - 1:
                 end = file_size - 1
             # logger.debug("Reading from %s to %s" % (start, end))
-            b = self.read_bytes(start, end)
+            b = self.__read_range(start, end, file_size)
         self._offset += len(b)
         return b
 
+    def __read_range(self, start, end, file_size):
+        """Reads bytes from position start to position end, inclusive.
+        The prefetched bytes will be used if they are in the same range.
+        If PREFETCH is True, the next range with the same length will be downloaded in the background,
+            so that sequential reads do not wait for the download.
+        The next range is prefetched only after a sequential read of at least BUFFER_SIZE bytes,
+            so that small or random access reads (e.g. checking the first bytes of the file)
+            do not send extra requests, which cannot be cancelled once started.
+        """
+        sequential = start == self.__read_position
+        self.__read_position = end + 1
+        prefetch = self.__prefetch
+        self.__prefetch = None
+        b = None
+        if prefetch:
+            prefetch_start, prefetch_end, future = prefetch
+            if prefetch_start == start and prefetch_end == end:
+                try:
+                    b = future.result()
+                except Exception as ex:
+                    logger.debug("Failed to prefetch bytes of %s: %s" % (self.uri, ex))
+            else:
+                future.cancel()
+        if b is None:
+            b = self.read_bytes(start, end)
+
+        if self.PREFETCH and sequential and end - start + 1 >= self.BUFFER_SIZE and end + 1 < file_size:
+            next_start = end + 1
+            next_end = min(next_start + end - start, file_size - 1)
+            future = self.prefetch_executor.submit(self.read_bytes, next_start, next_end)
+            self.__prefetch = (next_start, next_end, future)
+        return b
+
+    def __cancel_prefetch(self):
+        if self.__prefetch:
+            self.__prefetch[2].cancel()
+            self.__prefetch = None
+
     def write(self, b):
         """Writes data into the file.
 
@@ -192,12 +251,20 @@ class CloudStorageIO(StorageIOSeekable):
         """
         if self.closed:
             raise ValueError("write to closed file %s" % self.uri)
+        self.__cancel_prefetch()
         # Create a temp local file
         self.local()
         # Write data from buffer to file
-        self.__file_io.seek(self.tell())
-        size = self.__file_io.write(b)
-        self._offset += size
+        if self._appending or not hasattr(os, "pwrite"):
+            # In appending mode, data is always written to the end of the file.
+            self.__file_io.seek(self._offset)
+            size = self.__file_io.write(b)
+            self._offset = self.__file_io.tell()
+        else:
+            # Positioned write, without moving the file position of the temp file.
+            size = os.pwrite(self.__file_io.fileno(), b, self._offset)
+            self._offset += size
+        self.__size = None
         return size
 
     def __rm_temp(self):
@@ -232,6 +299,7 @@ class CloudStorageIO(StorageIOSeekable):
         if self._closed:
             return
 
+        self.__cancel_prefetch()
         if self.__file_io:
             if not self.__file_io.closed:
                 self.__file_io.close()
@@ -241,6 +309,7 @@ class CloudStorageIO(StorageIOSeekable):
             logger.debug("Uploading file to %s" % self.uri)
             with open(self.temp_path, 'rb') as f:
                 self.upload(f)
+            self.__size = None
             # Remove __temp_file if it exists.
             self.__rm_temp()
             # Set _closed attribute
@@ -256,6 +325,14 @@ class CloudStorageIO(StorageIOSeekable):
     def get_size(self):
         raise NotImplementedError()
 
+    def get_size_if_exists(self):
+        """Gets the size of the file, or None if the file does not exist.
+        Sub-class may override this method to check the existence and get the size with a single request.
+        """
+        if not self.exists():
+            return None
+        return self.get_size()
+
     def delete(self):
         raise NotImplementedError()
 
@@ -268,6 +345,17 @@ class CloudStorageIO(StorageIOSeekable):
         """
         raise NotImplementedError()
 
+    def download_if_exists(self, to_file_obj):
+        """Downloads the data to a file object if the file exists.
+        Sub-class may override this method to download without checking the existence first.
+
+        Returns: True if the file is downloaded, otherwise False.
+        """
+        if not self.exists():
+            return False
+        self.download(to_file_obj)
+        return True
+
     def read_bytes(self, start, end):
         """Reads bytes from position start to position end, inclusive
         """
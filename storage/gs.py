@@ -22,9 +22,15 @@ import warnings
 import tempfile
 import base64
 import binascii
+import threading
+import time
 from functools import wraps
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as RequestsConnectionError
+from urllib3.util.retry import Retry
 from google.cloud import storage
-from google.cloud.exceptions import ServerError, Forbidden
+from google.cloud.exceptions import ServerError, Forbidden, NotFound
 from ..strings import Base64String
 from ..tasks import FunctionTask
 from .base import StorageFolderBase
@@ -51,7 +57,7 @@ def setup_credentials(env_name, to_json_file=None):
 
 def api_call(func=None, *args, **kwargs):
     """Makes API call and retry if there is an exception.
-    This is designed to resolve the 500 Backend Error from Google.
+    This is designed to resolve the 500 Backend Error from Google and transient connection errors.
 
     Args:
         func (callable): A function or method.
@@ -64,16 +70,36 @@ def api_call(func=None, *args, **kwargs):
     if not func:
         return None
         # logger.debug("Making API call: %s..." % func.__name__)
+    # warnings.catch_warnings() is not thread-safe.
+    # The warnings are suppressed only in the main thread, as api_call() is also called by the thread pools.
+    if threading.current_thread() is not threading.main_thread():
+        return _run_and_retry(func, *args, **kwargs)
     with warnings.catch_warnings():
         warnings.simplefilter("ignore", ResourceWarning)
         warnings.simplefilter("ignore", UserWarning)
-        return FunctionTask(func, *args, **kwargs).run_and_retry(
-            max_retry=3,
-            exceptions=ServerError,
-            base_interval=60,
-            retry_pattern='linear',
-            capture_output=False
-        )
+        return _run_and_retry(func, *args, **kwargs)
+
+
+def _run_and_retry(func, *args, **kwargs):
+    """Runs func(*args, **kwargs) and retries on server errors and connection errors, see api_call().
+    """
+    # Connection errors are retried with a short exponential backoff (2, 4 and 8 seconds),
+    # while server errors are retried after a longer linear interval (60, 120 and 180 seconds).
+    connection_task = FunctionTask(func, *args, **kwargs)
+    return FunctionTask(
+        connection_task.run_and_retry,
+        max_retry=3,
+        exceptions=RequestsConnectionError,
+        base_interval=2,
+        retry_pattern='exponential',
+        capture_output=False
+    ).run_and_retry(
+        max_retry=3,
+        exceptions=ServerError,
+        base_interval=60,
+        retry_pattern='linear',
+        capture_output=False
+    )
 
 
 def api_decorator(method):
@@ -96,7 +122,11 @@ def api_decorator(method):
 class GSObject(BucketStorageObject):
     """The base class for Google Storage Object.
     """
-    MAX_BATCH_SIZE = 900
+    # The maximum number of calls in a batch request supported by Google Cloud Storage.
+    # See https://cloud.google.com/storage/docs/batch
+    MAX_BATCH_SIZE = 100
+    # The number of threads for sending concurrent requests, e.g. copying or deleting blobs.
+    MAX_WORKERS = int(os.environ.get("ARIES_GCS_CONCURRENCY", 16))
 
     @property
     def blob(self):
@@ -107,25 +137,35 @@ class GSObject(BucketStorageObject):
         This does not check whether the object exists.
         Use blob.exists() to determine whether or not the blob exists.
 
+        This does not send any HTTP request.
+        The blob metadata (e.g. size) is not loaded unless the blob is obtained by listing the bucket.
+        Use GSFile.load_metadata() to load the metadata when it is needed.
+
         """
         if self._blob is None:
-            # logger.debug("Getting blob: %s" % self.uri)
-            # The following line will avoid sending a GET request
-            # but bucket object will not have the real metadata
-            bucket = self.client.bucket(self.bucket_name)
-            file_blob = api_call(bucket.get_blob, self.prefix)
-            if file_blob is None:
-                # The following will not make an HTTP request.
-                # It simply instantiates a blob object owned by this bucket.
-                # See https://googleapis.github.io/google-cloud-python/latest/storage/buckets.html
-                # #google.cloud.storage.bucket.Bucket.blob
-                file_blob = self.bucket.blob(self.prefix)
-            self._blob = file_blob
+            # The following will not make an HTTP request.
+            # It simply instantiates a blob object owned by this bucket.
+            # See https://googleapis.github.io/google-cloud-python/latest/storage/buckets.html
+            # #google.cloud.storage.bucket.Bucket.blob
+            self._blob = self.bucket.blob(self.prefix)
         return self._blob
 
     @api_decorator
     def init_client(self):
-        return storage.Client()
+        client = storage.Client()
+        # The client is cached and shared by all GS objects, see BucketStorageObject.get_client().
+        # The default connection pool (10 connections) is too small for the concurrent requests.
+        # Idempotent requests failed with 502, 503 or 504 will be retried by the HTTP adapter.
+        # The last response is returned instead of raising RetryError when the retries are exhausted,
+        # so that the client library raises ServerError as usual, which is handled by api_call().
+        pool_size = max(64, 2 * self.MAX_WORKERS)
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=Retry(total=3, backoff_factor=1, status_forcelist=[502, 503, 504], raise_on_status=False)
+        )
+        client._http.mount("https://", adapter)
+        return client
 
     @api_decorator
     def init_bucket(self):
@@ -156,7 +196,7 @@ class GSObject(BucketStorageObject):
         Returns:
             Blob: The Google Cloud Storage blob.
         """
-        blob = storage.Blob(self.prefix, self.bucket)
+        blob = self.blob
         if not blob.exists():
             blob.upload_from_string("")
         return blob
@@ -170,16 +210,21 @@ class GSObject(BucketStorageObject):
     def copy_blob(self, blob, to):
         """Copies a blob object in the bucket to a new location.
 
+        The prefix of this object in the blob name will be replaced by the prefix of the destination.
+
         Args:
             blob: A Google Cloud Storage Blob object in the bucket.
-            to: URI of the new blob (gs://...).
+            to: URI of the new blob (gs://...), or a GSObject of the destination.
 
         Returns: True if the blob is copied. Otherwise False.
 
         """
-        destination = GSObject(to)
-        new_name = str(blob.name).replace(self.prefix, destination.prefix, 1)
-        if new_name != str(blob.name) or self.bucket_name != destination.bucket_name:
+        destination = to if isinstance(to, GSObject) else GSObject(to)
+        name = blob.name
+        if not name.startswith(self.prefix):
+            return False
+        new_name = destination.prefix + name[len(self.prefix):]
+        if new_name != name or self.bucket_name != destination.bucket_name:
             self.bucket.copy_blob(blob, destination.bucket, new_name)
             return True
         return False
@@ -190,6 +235,15 @@ class GSObject(BucketStorageObject):
 
 
 class GSPrefix(CloudStoragePrefix, GSObject):
+    # The number of seconds the result of list_children() is cached.
+    LIST_CACHE_SEC = float(os.environ.get("ARIES_GCS_LIST_CACHE_SEC", 2))
+
+    def __init__(self, uri):
+        GSObject.__init__(self, uri)
+        # Caches the result of list_children() as a 3-tuple (expire_time, blobs, prefixes).
+        # The cache expires after LIST_CACHE_SEC seconds, or when the objects are modified by this instance.
+        self.__children = None
+
     # @api_decorator
     def batch_request(self, blobs, method, *args, **kwargs):
         """Sends a batch request to run method of a batch of blobs.
@@ -221,19 +275,58 @@ class GSPrefix(CloudStoragePrefix, GSObject):
         return counter
 
     # @api_decorator
-    def batch_operation(self, method, *args, **kwargs):
-        blobs = self.blobs()
-        batch = []
+    def batch_operation(self, method, *args, blobs=None, **kwargs):
+        """Runs method for blobs having the prefix, using batch requests.
+        The "method" will be applied to each blob like method(blob, *args, **kwargs)
+
+        The blobs are grouped into batches of MAX_BATCH_SIZE,
+        so that each HTTP request sends the calls for up to MAX_BATCH_SIZE blobs.
+        The batch requests are sent concurrently by a pool of MAX_WORKERS threads.
+
+        Args:
+            method: The method for processing each blob.
+            *args: Additional arguments for method.
+            blobs: A list or an iterator of blobs to be processed.
+                Defaults to all blobs having the prefix.
+                When blobs is an iterator, the processing starts as soon as the first batch is available.
+            **kwargs: Keyword arguments for method.
+
+        Returns: The number of blobs processed.
+
+        """
+        if blobs is None:
+            blobs = self.blobs()
+        # Initialize the bucket before starting the threads.
+        self.bucket
         counter = 0
-        for blob in blobs:
-            batch.append(blob)
-            if len(batch) > self.MAX_BATCH_SIZE:
-                counter += self.batch_request(batch, method, *args, **kwargs)
+        pending = set()
+        batch = []
+        with ThreadPoolExecutor(max_workers=self.MAX_WORKERS) as executor:
+            for blob in blobs:
+                batch.append(blob)
+                if len(batch) < self.MAX_BATCH_SIZE:
+                    continue
+                # Limit the number of pending requests so that the blobs are not all held in memory.
+                if len(pending) >= 2 * self.MAX_WORKERS:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        counter += future.result()
+                pending.add(executor.submit(self.batch_request, batch, method, *args, **kwargs))
                 batch = []
-        if batch:
-            counter += self.batch_request(batch, method, *args, **kwargs)
+            if batch:
+                pending.add(executor.submit(self.batch_request, batch, method, *args, **kwargs))
+            for future in pending:
+                counter += future.result()
         return counter
 
+    def _iter_blobs(self, delimiter=None):
+        """Iterates through the blobs in the bucket having the prefix.
+        The blobs are listed page by page as the iteration proceeds.
+
+        See blobs() for the description of the arguments.
+        """
+        return self.bucket.list_blobs(prefix=self.prefix, delimiter=delimiter)
+
     @api_decorator
     def blobs(self, delimiter=None):
         """Gets the blobs in the bucket having the prefix.
@@ -250,7 +343,7 @@ class GSPrefix(CloudStoragePrefix, GSObject):
         See Also: https://googleapis.github.io/google-cloud-python/latest/storage/blobs.html
 
         """
-        return list(self.bucket.list_blobs(prefix=self.prefix, delimiter=delimiter))
+        return list(self._iter_blobs(delimiter))
 
     @property
     def uri_list(self):
@@ -262,39 +355,87 @@ class GSPrefix(CloudStoragePrefix, GSObject):
             if not b.name.endswith("/")
         ]
 
+    @api_decorator
+    def list_children(self):
+        """Lists the blobs and the sub-folders directly under the prefix, using a single list request.
+
+        The result is cached for LIST_CACHE_SEC seconds, so that files, folders, file_paths and folder_paths
+        accessed one after another share the same list request.
+        The cache is also cleared by delete(), copy() and upload_many().
+        Objects modified outside of this instance will not be reflected until the cache expires or is cleared.
+        exists() does not use the cache.
+
+        Returns: A 2-tuple (blobs, prefixes)
+            blobs: A list of GCS blobs having the prefix but not in any sub-folder.
+            prefixes: A list of prefixes (str) of the sub-folders, each ends with "/".
+
+        """
+        if self.__children is None or self.__children[0] <= time.monotonic():
+            iterator = self.bucket.list_blobs(prefix=self.prefix, delimiter='/')
+            # The prefixes are available only after iterating through all pages.
+            blobs = list(iterator)
+            self.__children = (time.monotonic() + self.LIST_CACHE_SEC, blobs, sorted(iterator.prefixes))
+        _, blobs, prefixes = self.__children
+        return list(blobs), list(prefixes)
+
+    def clear_cache(self):
+        """Clears the cached listing of the objects with the prefix.
+        """
+        self.__children = None
+
+    def __storage_file(self, blob):
+        """Initializes a StorageFile from a blob in the bucket.
+        The blob metadata (e.g. size) from listing the bucket will be reused by the StorageFile.
+        """
+        from .io import StorageFile
+        storage_file = StorageFile("gs://%s/%s" % (self.bucket_name, blob.name))
+        storage_file.raw_io._blob = blob
+        return storage_file
+
+    @property
+    def objects(self):
+        """All storage files with the prefix, including the files in sub-folders.
+        """
+        return [self.__storage_file(b) for b in self.blobs() if not b.name.endswith("/")]
+
     @property
     def files(self):
-        from .io import StorageFile
-        storage_files = []
-        for b in self.blobs("/"):
-            if b.name.endswith("/"):
-                continue
-            storage_file = StorageFile("gs://%s/%s" % (self.bucket_name, b.name))
-            storage_file.raw_io._blob = b
-            storage_files.append(storage_file)
-        return storage_files
+        blobs, _ = self.list_children()
+        return [self.__storage_file(b) for b in blobs if not b.name.endswith("/")]
 
     @property
     def folders(self):
         return self.list_folders()
 
-    @api_decorator
     def list_folders(self):
         from .io import StorageFolder
-        iterator = self.bucket.list_blobs(prefix=self.prefix, delimiter='/')
-        list(iterator)
+        _, prefixes = self.list_children()
         return [
             StorageFolder("gs://%s/%s" % (self.bucket_name, p))
-            for p in iterator.prefixes
+            for p in prefixes
         ]
 
+    @property
+    def size(self):
+        """The size in bytes of all objects with the prefix.
+        The sizes are returned by the list request, no request is sent for each object.
+        """
+        return sum(b.size or 0 for b in self.blobs())
+
+    @api_decorator
     def exists(self):
-        return True if self.blob.exists() or self.objects else False
+        if self.blob.exists():
+            return True
+        # Only one blob is needed to determine whether there is any object with the prefix.
+        blobs = self.bucket.list_blobs(prefix=self.prefix, max_results=1)
+        return True if list(blobs) else False
 
     @api_decorator
     def delete(self):
         """Deletes all objects with the same prefix."""
-        counter = self.batch_operation(self.delete_blob)
+        self.clear_cache()
+        # Deleting the blobs while listing them.
+        counter = self.batch_operation(self.delete_blob, blobs=self._iter_blobs())
         logger.debug("%d files deleted." % counter)
         return counter
 
@@ -385,11 +526,24 @@ class GSPrefix(CloudStoragePrefix, GSObject):
                 # simply replace the prefix.
                 pass
         # logger.debug("Copying files to %s" % to)
-        source_files = self.blobs()
-        if not source_files:
-            logger.debug("No files in %s" % self.uri)
+        destination = GSObject(to)
+        if destination.bucket_name == self.bucket_name and destination.prefix == self.prefix:
+            logger.debug("Destination is the same as the source, no files copied.")
             return 0
-        counter = self.batch_operation(self.copy_blob, to)
+        self.clear_cache()
+        if destination.bucket_name == self.bucket_name and (
+                destination.prefix.startswith(self.prefix) or self.prefix.startswith(destination.prefix)):
+            # The copies may have the same prefix as this object.
+            # List all the blobs before copying so that the copies are not listed and copied again.
+            source_files = self.blobs()
+        else:
+            # Copying the blobs while listing them.
+            source_files = self._iter_blobs()
+        # Initialize the destination bucket once for all blobs.
+        destination.bucket
+        counter = self.batch_operation(self.copy_blob, destination, blobs=source_files)
+        if not counter:
+            logger.debug("No files in %s" % self.uri)
         logger.debug("%d files copied." % counter)
         return counter
 
@@ -398,7 +552,16 @@ class GSFolder(GSPrefix, StorageFolderBase):
     """Represents a Google Cloud Storage Folder
 
     Method Resolution Order: GSFolder, GSObject, StorageFolder, StorageObject
+
+    GCS does not support uploading multiple files in one request.
+    upload_many() uploads the files concurrently with a thread pool shared by all folders,
+        in which each thread uses its own storage.Client.
     """
+    # Thread pool for upload_many(), initialized when it is first used.
+    upload_executor = None
+    upload_executor_lock = threading.Lock()
+    # Stores the storage.Client of each thread in the upload_executor
+    upload_thread_data = threading.local()
 
     def __init__(self, uri):
         """Initializes a Google Cloud Storage Directory.
@@ -408,45 +571,77 @@ class GSFolder(GSPrefix, StorageFolderBase):
 
         """
         # super() will call the __init__() of StorageObject, StorageFolder and GSObject
-        GSObject.__init__(self, uri)
+        GSPrefix.__init__(self, uri)
         StorageFolderBase.__init__(self, uri)
 
         # Make sure prefix ends with "/", otherwise it is not a "folder"
         if self.prefix and not self.prefix.endswith("/"):
             self.prefix += "/"
 
-    def exists(self):
-        return True if self.blob.exists() or self.file_paths or self.folder_paths else False
-
     @property
     def folder_paths(self):
         """Folders(Directories) in the directory.
         """
-        return self.__folders_paths()
-
-    @api_decorator
-    def __folders_paths(self):
-        iterator = self.bucket.list_blobs(prefix=self.prefix, delimiter='/')
-        list(iterator)
+        _, prefixes = self.list_children()
         return [
             "gs://%s/%s" % (self.bucket_name, p)
-            for p in iterator.prefixes
+            for p in prefixes
         ]
 
     @property
     def file_paths(self):
         """Files in the directory
         """
-        paths = self.__file_paths()
-        return paths
-
-    def __file_paths(self):
+        blobs, _ = self.list_children()
         return [
             "gs://%s/%s" % (self.bucket_name, b.name)
-            for b in self.blobs("/")
+            for b in blobs
             if not b.name.endswith("/")
         ]
 
+    def upload_many(self, local_paths):
+        """Uploads local files into this folder concurrently.
+        Each file is uploaded to this folder with the same basename.
+        Existing files in this folder will be overwritten.
+
+        Args:
+            local_paths (list): A list of paths of local files.
+
+        Returns: A list of the URIs of the uploaded files.
+
+        Raises:
+            ValueError: If more than one local file has the same basename.
+
+        """
+        blob_names = [self.prefix + os.path.basename(local_path) for local_path in local_paths]
+        if len(set(blob_names)) != len(blob_names):
+            duplicates = sorted(set(name for name in blob_names if blob_names.count(name) > 1))
+            raise ValueError("Local files with the same basename cannot be uploaded to the same folder: %s" % (
+                ", ".join(os.path.basename(name) for name in duplicates)
+            ))
+        with self.upload_executor_lock:
+            if GSFolder.upload_executor is None:
+                GSFolder.upload_executor = ThreadPoolExecutor(max_workers=self.MAX_WORKERS)
+        futures = [
+            self.upload_executor.submit(self.__upload_file, local_path, blob_name)
+            for local_path, blob_name in zip(local_paths, blob_names)
+        ]
+        # Raise the first exception without waiting for the other uploads.
+        for future in as_completed(futures):
+            future.result()
+        self.clear_cache()
+        return ["gs://%s/%s" % (self.bucket_name, blob_name) for blob_name in blob_names]
+
+    def __upload_file(self, local_path, blob_name):
+        """Uploads a local file using the storage.Client of the current thread.
+        """
+        client = getattr(self.upload_thread_data, "client", None)
+        if client is None:
+            client = storage.Client()
+            self.upload_thread_data.client = client
+        blob = client.bucket(self.bucket_name).blob(blob_name)
+        api_call(blob.upload_from_filename, local_path)
+
     @api_decorator
     def filter_files(self, prefix):
         return [
@@ -457,6 +652,14 @@ class GSFolder(GSPrefix, StorageFolderBase):
 
 
 class GSFile(GSObject, CloudStorageIO):
+    PREFETCH = True
+    # Reading more bytes than CHUNK_THRESHOLD will be split into chunks of CHUNK_SIZE bytes,
+    # which will be downloaded concurrently.
+    CHUNK_THRESHOLD = 16 * 1024 * 1024
+    CHUNK_SIZE = 8 * 1024 * 1024
+    # Thread pool for downloading the chunks, shared by all files.
+    chunk_executor = ThreadPoolExecutor(max_workers=4)
+
     def __init__(self, uri):
         """Represents a file on Google Cloud Storage as a file-like object implementing the IOBase interface.
 
@@ -470,23 +673,95 @@ class GSFile(GSObject, CloudStorageIO):
         GSObject.__init__(self, uri)
         CloudStorageIO.__init__(self, uri)
 
+    def load_metadata(self):
+        """Loads the metadata of the blob from the server, if the metadata is not loaded.
+        Blobs obtained by listing the bucket already have the metadata.
+
+        Returns: The blob. The metadata will be empty if the blob does not exist.
+        """
+        blob = self.blob
+        if blob.etag is None:
+            try:
+                api_call(blob.reload)
+            except NotFound:
+                pass
+        return blob
+
     @property
     def updated_time(self):
-        return self.blob.updated
+        return self.load_metadata().updated
 
     @property
     def md5_hex(self):
-        return binascii.hexlify(base64.urlsafe_b64decode(self.blob.md5_hash)).decode()
+        return binascii.hexlify(base64.urlsafe_b64decode(self.load_metadata().md5_hash)).decode()
 
     def get_size(self):
-        return self.blob.size
+        return self.load_metadata().size
+
+    def get_size_if_exists(self):
+        blob = self.blob
+        if blob.etag is not None:
+            # The metadata is already loaded, e.g. the blob is obtained by listing the bucket.
+            return blob.size
+        # Reloading the metadata checks the existence and gets the size with a single request.
+        try:
+            api_call(blob.reload)
+        except NotFound:
+            return None
+        return blob.size
 
     def read_bytes(self, start, end):
-        return api_call(self.blob.download_as_string, start=start, end=end)
+        if end - start + 1 <= self.CHUNK_THRESHOLD:
+            return self.__download_range(start, end)
+        futures = []
+        for chunk_start in range(start, end + 1, self.CHUNK_SIZE):
+            chunk_end = min(chunk_start + self.CHUNK_SIZE - 1, end)
+            futures.append(self.chunk_executor.submit(self.__download_range, chunk_start, chunk_end))
+        return b"".join([future.result() for future in futures])
+
+    def __download_range(self, start, end):
+        # The checksum of the whole object cannot be used to validate a range of bytes.
+        return api_call(self.blob.download_as_bytes, start=start, end=end, checksum=None)
+
+    @staticmethod
+    def __is_seekable(file_obj):
+        seekable = getattr(file_obj, "seekable", None)
+        return bool(seekable and seekable())
 
     def download(self, to_file_obj):
-        api_call(self.blob.download_to_file, to_file_obj)
+        if not self.__is_seekable(to_file_obj):
+            # A non-seekable file object (e.g. a pipe) cannot be rewound for a retry.
+            self.blob.download_to_file(to_file_obj)
+            return to_file_obj
+        # Each retry restarts the download from the initial position of the file object.
+        position = to_file_obj.tell()
+
+        def download_to_file():
+            to_file_obj.seek(position)
+            to_file_obj.truncate()
+            self.blob.download_to_file(to_file_obj)
+
+        api_call(download_to_file)
         return to_file_obj
 
+    def download_if_exists(self, to_file_obj):
+        # The download request fails with NotFound if the blob does not exist.
+        try:
+            self.download(to_file_obj)
+        except NotFound:
+            return False
+        return True
+
     def upload(self, from_file_obj):
-        api_call(self.blob.upload_from_file, from_file_obj)
+        if not self.__is_seekable(from_file_obj):
+            # A non-seekable file object (e.g. a pipe) cannot be rewound for a retry.
+            self.blob.upload_from_file(from_file_obj)
+            return
+        # Each retry restarts the upload from the initial position of the file object.
+        position = from_file_obj.tell()
+
+        def upload_from_file():
+            from_file_obj.seek(position)
+            self.blob.upload_from_file(from_file_obj)
+
+        api_call(upload_from_file)
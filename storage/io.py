@@ -3,10 +3,8 @@
 import os
 import json
 import logging
-import binascii
 import inspect
 import traceback
-from google.cloud import storage
 from io import SEEK_SET, UnsupportedOperation
 from io import BufferedIOBase, BufferedRandom, BufferedReader, BufferedWriter, TextIOWrapper, BytesIO
 from .base import StorageObject, StorageFolderBase
@@ -153,6 +151,9 @@ class StorageFolder(StorageFolderBase):
 
         Returns: A list of StorageFiles in the folder.
 
+        For Google Cloud Storage, the listing is cached for a few seconds (GSPrefix.LIST_CACHE_SEC),
+        files created or deleted through other objects in that time may not be reflected.
+
         """
         try:
             return self.raw.files
@@ -166,7 +167,13 @@ class StorageFolder(StorageFolderBase):
 
         Returns: A list of StorageFolders in the folder.
 
+        For Google Cloud Storage, the listing is cached for a few seconds, see files.
+
         """
+        try:
+            return self.raw.folders
+        except AttributeError:
+            pass
         return [StorageFolder(f) for f in self.folder_paths]
 
     @property
@@ -208,10 +215,14 @@ class StorageFolder(StorageFolderBase):
 
     @property
     def file_paths(self):
+        """URIs of the files in the folder. The listing may be cached for a few seconds, see files.
+        """
         return self.raw.file_paths
 
     @property
     def folder_paths(self):
+        """URIs of the sub-folders in the folder. The listing may be cached for a few seconds, see files.
+        """
         return self.raw.folder_paths
 
     def exists(self):
@@ -271,6 +282,11 @@ class StorageFolder(StorageFolderBase):
 
     def move(self, to, contents_only=False):
         """Moves the objects to another location."""
+        dest_path = to if contents_only else os.path.join(to, self.name)
+        if StorageFolder(dest_path).uri == self.uri:
+            # Moving the folder to itself, the folder should not be deleted.
+            logger.debug("Destination is the same as the source, no files moved.")
+            return
         self.copy(to, contents_only=contents_only)
         dest_folder = StorageFolder(to)
         if dest_folder.exists():
@@ -339,10 +355,17 @@ class StorageFolder(StorageFolderBase):
             return True
 
     def empty(self):
+        # The files and folders are deleted through other objects,
+        # the listing cached by the raw object (if any) is cleared before and after deleting them.
+        clear_cache = self.__get_raw_attr("clear_cache")
+        if clear_cache:
+            clear_cache()
         for f in self.files:
             f.delete()
         for f in self.folders:
             f.delete()
+        if clear_cache:
+            clear_cache()
 
     # Sub-class of StorageFolderBase can optionally implement the following methods
     #
@@ -565,7 +588,7 @@ class StorageFile(StorageObject, BufferedIOWrapper, BufferedIOBase):
         """Determines the buffer size
         """
 
-        buffering = self.BUFFER_SIZE
+        buffering = self.raw_io.BUFFER_SIZE
         # For local file only
         from .file import LocalFile
         if isinstance(self.raw_io, LocalFile):
@@ -830,8 +853,12 @@ class StorageFile(StorageObject, BufferedIOWrapper, BufferedIOBase):
 
     def move(self, to):
         """Moves the objects to another location."""
-        self.copy(to)
         dest_file = StorageFile(to)
+        if dest_file.uri == self.uri:
+            # Moving the file to itself, the file should not be deleted.
+            logger.debug("Destination is the same as the source, file not moved.")
+            return
+        self.copy(to)
         if dest_file.exists():
             self.delete()
         else:
@@ -893,7 +920,8 @@ class StorageFile(StorageObject, BufferedIOWrapper, BufferedIOBase):
         """
         # Reset the offset to the beginning of the file if file is opened.
         if self.closed:
-            with self.open("rb") as f:
+            # Read from the raw IO so that only 2 bytes are requested, instead of filling the buffer.
+            with self.raw_io.open('rb') as f:
                 b = f.read(2)
         else:
             offset = self.tell()
@@ -901,9 +929,8 @@ class StorageFile(StorageObject, BufferedIOWrapper, BufferedIOBase):
             b = self.read(2)
             # Move offset back
             self.seek(offset)
-        b = binascii.hexlify(b)
-        logger.debug("File begins with: %s" % b)
-        return b == b'1f8b'
+        logger.debug("File begins with: %s" % b.hex())
+        return b == b'\x1f\x8b'
 
     def close(self):
         # logger.debug("Closing %s ..." % self.uri)
@@ -1006,7 +1033,8 @@ class FileBatch(list):
         if not len(batch):
             return
 
-        client = storage.Client()
+        # Use the client cached by the raw IO.
+        client = batch[0].raw_io.client
 
         with client.batch():
             for f in batch:
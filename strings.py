@@ -6,8 +6,26 @@ import base64
 import os
 import json
 import copy
+import functools
 from collections import abc
 
+# Names of the python str methods to be wrapped by AString.
+# Dunder methods are resolved by python through the type slots and they are not wrapped.
+_STR_METHODS = frozenset(name for name in dir(str) if not name.startswith("__"))
+
+# Matches the characters removed by AString.remove_non_alphanumeric()
+_NON_ALPHANUMERIC_RE = re.compile(r"[^A-Za-z0-9]+")
+# Matches the ANSI escape sequences removed by AString.remove_escape_sequence()
+_ESCAPE_SEQUENCE_RE = re.compile(r"\x1B\[[0-?]*[ -/]*[@-~]")
+
+
+@functools.lru_cache(maxsize=32)
+def _format_datetime(dt, fmt):
+    """Formats a datetime.datetime instance.
+    The results are cached so that the same date and time is formatted only once.
+    """
+    return dt.strftime(fmt)
+
 
 class AString(str):
     """AString represents "Aries String", a sub-class of python built-in str with additional methods.
@@ -49,10 +67,30 @@ class AString(str):
             https://stackoverflow.com/questions/7255655/how-to-subclass-str-in-python
 
         """
+        # If the method is a method of str
+        if item in _STR_METHODS:  # only handle str methods here
+            # Bound method
+            return AString.__str_method(item).__get__(self, type(self))
+        else:
+            # Delegate to parent
+            return super(AString, self).__getattribute__(item)
+
+    # Caches the wrapped str methods, keyed by method name.
+    __str_methods = dict()
+
+    @staticmethod
+    def __str_method(item):
+        """Gets the wrapper of a python str method.
+        The wrapper is created once for each method name and reused by all AString instances.
+        """
+        method = AString.__str_methods.get(item)
+        if method is not None:
+            return method
+
         def method(s, *args, **kwargs):
             # super() returns a a proxy object that delegates method calls to a parent or sibling class
             # See https://docs.python.org/3/library/functions.html#super
-            value = getattr(super(AString, self), item)(*args, **kwargs)
+            value = getattr(super(AString, s), item)(*args, **kwargs)
             # Return value is str, list, tuple:
             if isinstance(value, str):
                 return type(s)(value)
@@ -63,13 +101,8 @@ class AString(str):
             # Return value is dict, bool, or int
             return value
 
-        # If the method is a method of str
-        if item in dir(str):  # only handle str methods here
-            # Bound method
-            return method.__get__(self, type(self))
-        else:
-            # Delegate to parent
-            return super(AString, self).__getattribute__(item)
+        AString.__str_methods[item] = method
+        return method
 
     def prepend(self, s, delimiter='_'):
         """Prepends the string with another string or a list of strings, connected by the delimiter.
@@ -99,17 +132,19 @@ class AString(str):
             s = [s]
         return AString(delimiter.join([self] + s))
 
-    def append_datetime(self, dt=datetime.datetime.now(), fmt="%Y%m%d_%H%M%S"):
+    def append_datetime(self, dt=None, fmt="%Y%m%d_%H%M%S"):
         """Appends date and time.
         The current date and time will be appended by default.
 
         Args:
-            dt (datetime.datetime): A datetime.datetime instance.
+            dt (datetime.datetime): A datetime.datetime instance, defaults to the current date and time.
             fmt (str): The format of the datetime.
 
         Returns: An AString instance
 
         """
+        if dt is None:
+            dt = datetime.datetime.now()
         datetime_string = dt.strftime(fmt)
         return self.append(datetime_string)
 
@@ -122,7 +157,11 @@ class AString(str):
         Returns: An AString instance
 
         """
-        return self.append_datetime(fmt=fmt)
+        now = datetime.datetime.now()
+        if "%f" in fmt:
+            return self.append(now.strftime(fmt))
+        # The microseconds are not used by the format, the results can be cached for each second.
+        return self.append(_format_datetime(now.replace(microsecond=0), fmt))
 
     def append_random(self, choices, n):
         """Appends a random string of n characters.
@@ -134,7 +173,7 @@ class AString(str):
         Returns: An AString instance
 
         """
-        random_chars = ''.join(random.choice(choices) for _ in range(n))
+        random_chars = ''.join(random.choices(choices, k=n))
         return self.append(random_chars)
 
     def append_random_letters(self, n):
@@ -176,11 +215,7 @@ class AString(str):
         Returns: An AString with only alpha-numeric characters.
 
         """
-        new_str = "".join([
-            c for c in self
-            if (c in string.digits or c in string.ascii_letters)
-        ])
-        return AString(new_str)
+        return AString(_NON_ALPHANUMERIC_RE.sub("", self))
 
     def remove_non_ascii(self):
         """Removes non ASCII characters in the string.
@@ -195,7 +230,11 @@ class AString(str):
         Returns: An AString with escape sequence removed.
 
         """
-        return AString(re.sub(r"\x1B\[[0-?]*[ -/]*[@-~]", "", self))
+        return AString(_ESCAPE_SEQUENCE_RE.sub("", self))
+
+
+# Names of the AString methods (including the python str methods) to be wrapped by FileName.
+_ASTRING_METHODS = frozenset(name for name in dir(AString) if not name.startswith("_"))
 
 
 class FileName(AString):
@@ -227,32 +266,50 @@ class FileName(AString):
 
     """
     def __new__(cls, string_literal):
-        name_splits = string_literal.rsplit('.', 1)
+        # str.rpartition() is used so that the methods of AString or FileName are not involved.
+        basename, dot, extension = str.rpartition(string_literal, '.')
         filename = super(FileName, cls).__new__(cls, string_literal)
-        filename.basename = name_splits[0]
-        if len(name_splits) == 1:
-            filename.extension = ""
+        if dot:
+            filename.basename = basename
+            filename.extension = dot + extension
         else:
-            filename.extension = "." + name_splits[1]
+            filename.basename = str(string_literal)
+            filename.extension = ""
         return filename
 
     def __getattribute__(self, item):
         """Wraps the existing methods of python AString to return FileName objects.
         """
-        if item not in FileName.__dict__ and item in dir(AString):
-            def method(s, *args, **kwargs):
-                value = getattr(AString(self.basename), item)(*args, **kwargs)
-                if isinstance(value, AString) or isinstance(value, str):
-                    filename = type(s)(str(value) + self.extension)
-                    return filename
-                else:
-                    return value
+        if item in _ASTRING_METHODS and item not in FileName.__dict__:
             # Bound method
-            return method.__get__(self, type(self))
+            return FileName.__astring_method(item).__get__(self, type(self))
         else:
             # Delegate to parent
             return super(FileName, self).__getattribute__(item)
 
+    # Caches the wrapped AString methods, keyed by method name.
+    __astring_methods = dict()
+
+    @staticmethod
+    def __astring_method(item):
+        """Gets the wrapper of an AString method.
+        The wrapper is created once for each method name and reused by all FileName instances.
+        """
+        method = FileName.__astring_methods.get(item)
+        if method is not None:
+            return method
+
+        def method(s, *args, **kwargs):
+            value = getattr(AString(s.basename), item)(*args, **kwargs)
+            if isinstance(value, AString) or isinstance(value, str):
+                filename = type(s)(str(value) + s.extension)
+                return filename
+            else:
+                return value
+
+        FileName.__astring_methods[item] = method
+        return method
+
     @property
     def name_without_extension(self):
         """The filename without extension.
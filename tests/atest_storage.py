@@ -223,6 +223,20 @@ class TestStorage(AriesTest):
             self.assertIn(os.path.join(dst_folder_uri, "empty_file"), file_paths)
             self.assertIn(os.path.join(dst_folder_uri, "abc.txt"), file_paths)
 
+    def test_move_to_itself(self):
+        """Tests moving files and folders to their own location, which should not delete them.
+        """
+        file_uri = os.path.join(self.TEST_ROOT, "test_folder_0", "abc.txt")
+        StorageFile(file_uri).move(file_uri)
+        self.assertEqual(StorageFile(file_uri).read(), b"abc\ncba\n")
+
+        folder_uri = os.path.join(self.TEST_ROOT, "test_folder_0")
+        StorageFolder(folder_uri).move(folder_uri, contents_only=True)
+        self.assertTrue(StorageFile(file_uri).exists())
+        # Moving the folder into its parent folder
+        StorageFolder(folder_uri).move(self.TEST_ROOT)
+        self.assertTrue(StorageFile(file_uri).exists())
+
     def test_create_copy_and_delete_file(self):
         new_folder_uri = os.path.join(self.TEST_ROOT, "new_folder")
         with TempFolder(new_folder_uri) as folder:
@@ -0,0 +1,189 @@
+"""Contains offline tests for the cloud storage IO and Google Cloud Storage classes, using in-memory stubs.
+"""
+import logging
+import os
+import sys
+import threading
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+aries_parent = os.path.join(os.path.dirname(__file__), "..", "..")
+if aries_parent not in sys.path:
+    sys.path.append(aries_parent)
+from Aries.test import AriesTest
+from Aries.storage import gs
+from Aries.storage.cloud import CloudStorageIO
+logger = logging.getLogger(__name__)
+
+
+class MemoryFile(CloudStorageIO):
+    """A cloud storage file stored as bytes in memory.
+    The ranges requested by read_bytes() are recorded in the "ranges" attribute.
+    """
+    PREFETCH = True
+    BUFFER_SIZE = 4
+
+    def __init__(self, uri, content=None):
+        CloudStorageIO.__init__(self, uri)
+        self.content = content
+        self.ranges = []
+
+    def exists(self):
+        return self.content is not None
+
+    def get_size(self):
+        return len(self.content) if self.content is not None else None
+
+    def read_bytes(self, start, end):
+        self.ranges.append((start, end))
+        return self.content[start:end + 1]
+
+    def upload(self, from_file_obj):
+        self.content = from_file_obj.read()
+
+    def download(self, to_file_obj):
+        to_file_obj.write(self.content)
+        return to_file_obj
+
+    def delete(self):
+        self.content = None
+
+
+class TestCloudStorageIO(AriesTest):
+    def test_seek_after_write(self):
+        f = MemoryFile("gs://bucket/memory_file.txt")
+        f.open("w+b")
+        f.write(b"hello world")
+        self.assertEqual(f.tell(), 11)
+        self.assertEqual(f.seek(0, 1), 11)
+        self.assertEqual(f.seek(-5, 1), 6)
+        self.assertEqual(f.read(), b"world")
+        self.assertEqual(f.seek(-11, 2), 0)
+        self.assertEqual(f.read(5), b"hello")
+        f.close()
+        self.assertEqual(f.content, b"hello world")
+
+    def test_prefetch_sequential_reads(self):
+        f = MemoryFile("gs://bucket/memory_file.txt", b"0123456789abcdef")
+        self.assertEqual(f.read(4), b"0123")
+        self.assertEqual(f.read(4), b"4567")
+        self.assertEqual(f.read(4), b"89ab")
+        # Each range is downloaded only once, either by the read or by the prefetch.
+        self.assertEqual(f.ranges.count((4, 7)), 1)
+        self.assertEqual(f.ranges.count((8, 11)), 1)
+
+    def test_no_prefetch_for_small_reads(self):
+        f = MemoryFile("gs://bucket/memory_file.txt", b"0123456789abcdef")
+        self.assertEqual(f.read(2), b"01")
+        self.assertIsNone(f._CloudStorageIO__prefetch)
+        f.seek(8)
+        # Reading from a position other than the end of the last read is not sequential.
+        self.assertEqual(f.read(4), b"89ab")
+        self.assertIsNone(f._CloudStorageIO__prefetch)
+        self.assertEqual(f.ranges, [(0, 1), (8, 11)])
+
+    def test_prefetch_cancelled_for_another_range(self):
+        f = MemoryFile("gs://bucket/memory_file.txt", b"0123456789abcdef")
+        # Use a single worker busy with another task, so that the prefetch stays pending.
+        executor = ThreadPoolExecutor(max_workers=1)
+        f.prefetch_executor = executor
+        gate = threading.Event()
+        executor.submit(gate.wait)
+        try:
+            self.assertEqual(f.read(4), b"0123")
+            _, _, future = f._CloudStorageIO__prefetch
+            f.seek(12)
+            self.assertEqual(f.read(4), b"cdef")
+            self.assertTrue(future.cancelled())
+        finally:
+            gate.set()
+            executor.shutdown()
+        self.assertNotIn((4, 7), f.ranges)
+
+
+class TestGSFileChunks(AriesTest):
+    def test_read_bytes_in_chunks(self):
+        content = bytes(range(32))
+        gs_file = gs.GSFile("gs://bucket/chunked_file")
+        gs_file.CHUNK_THRESHOLD = 10
+        gs_file.CHUNK_SIZE = 4
+        ranges = []
+
+        def download_range(start, end):
+            ranges.append((start, end))
+            return content[start:end + 1]
+
+        gs_file._GSFile__download_range = download_range
+        # Small reads are downloaded with a single request.
+        self.assertEqual(gs_file.read_bytes(0, 9), content[0:10])
+        self.assertEqual(ranges, [(0, 9)])
+        # Large reads are split into chunks and reassembled in order.
+        ranges.clear()
+        self.assertEqual(gs_file.read_bytes(3, 20), content[3:21])
+        self.assertEqual(sorted(ranges), [(3, 6), (7, 10), (11, 14), (15, 18), (19, 20)])
+
+
+class FakeBlob:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeBlobIterator:
+    def __init__(self, blobs, prefixes):
+        self.blobs = blobs
+        self.prefixes = set(prefixes)
+
+    def __iter__(self):
+        return iter(self.blobs)
+
+
+class FakeBucket:
+    """A Google Cloud Storage bucket listing the blob names in the "names" attribute.
+    The number of list requests is counted in the "list_requests" attribute.
+    """
+    def __init__(self, names):
+        self.names = names
+        self.list_requests = 0
+
+    def list_blobs(self, prefix="", delimiter=None, max_results=None):
+        self.list_requests += 1
+        blobs = []
+        prefixes = set()
+        for name in sorted(self.names):
+            if not name.startswith(prefix):
+                continue
+            rest = name[len(prefix):]
+            if delimiter and delimiter in rest:
+                prefixes.add(prefix + rest.split(delimiter, 1)[0] + delimiter)
+            else:
+                blobs.append(FakeBlob(name))
+        return FakeBlobIterator(blobs[:max_results], prefixes)
+
+
+class TestGSFolderCache(AriesTest):
+    def test_listing_cache(self):
+        bucket = FakeBucket(["folder/a.txt", "folder/sub/b.txt"])
+        folder = gs.GSFolder("gs://bucket/folder/")
+        folder._bucket = bucket
+        folder.LIST_CACHE_SEC = 60
+        self.assertEqual(folder.file_paths, ["gs://bucket/folder/a.txt"])
+        self.assertEqual(folder.folder_paths, ["gs://bucket/folder/sub/"])
+        # The files and folders share the same list request.
+        self.assertEqual(bucket.list_requests, 1)
+        # Objects created through other objects are reflected after the cache expires.
+        bucket.names.append("folder/c.txt")
+        self.assertEqual(len(folder.file_paths), 1)
+        folder.LIST_CACHE_SEC = 0
+        folder.clear_cache()
+        self.assertEqual(len(folder.file_paths), 2)
+        self.assertEqual(len(folder.file_paths), 2)
+        self.assertEqual(bucket.list_requests, 3)
+
+
+class TestGSFileMetadata(AriesTest):
+    def test_size_from_listing(self):
+        gs_file = gs.GSFile("gs://bucket/listed_file.txt")
+        # A blob with the metadata from listing the bucket, which must not be reloaded.
+        blob = mock.Mock(etag="etag", size=11)
+        gs_file._blob = blob
+        self.assertEqual(gs_file.get_size_if_exists(), 11)
+        blob.reload.assert_not_called()
@@ -1,19 +1,22 @@
 """Contains tests for the Google Cloud (gcp) storage module.
 """
+import importlib.util
 import logging
 import os
 import sys
 import time
 import traceback
-from google.cloud import storage
+from concurrent.futures import ThreadPoolExecutor
 logger = logging.getLogger(__name__)
 try:
     from ..test import AriesTest
     from ..storage import StorageFolder, StorageFile, gs
 except:
-    aries_parent = os.path.join(os.path.dirname(__file__), "..", "..")
-    if aries_parent not in sys.path:
-        sys.path.append(aries_parent)
+    # sys.path is modified only if Aries is not installed (e.g. pip install -e) or in PYTHONPATH.
+    if importlib.util.find_spec("Aries") is None:
+        aries_parent = os.path.join(os.path.dirname(__file__), "..", "..")
+        if aries_parent not in sys.path:
+            sys.path.append(aries_parent)
     from Aries.test import AriesTest
     from Aries.storage import StorageFolder, StorageFile, gs
 
@@ -25,6 +28,8 @@ class TestGCStorage(AriesTest):
     # It will be set to True in setUpClass()
     # All tests will be skipped if GCP_ACCESS is False
     GCP_ACCESS = False
+    # The time (time.monotonic()) when the last test finished, see tearDown().
+    LAST_FINISHED = 0
 
     @classmethod
     def setUpClass(cls):
@@ -32,16 +37,21 @@ class TestGCStorage(AriesTest):
         super().setUpClass()
         try:
             # Check if GCP is accessible by listing all the buckets
-            storage.Client().list_buckets(max_results=1)
+            # The client is cached by GSObject and shared by all the tests.
+            gs.GSObject("gs://aries_test").client.list_buckets(max_results=1)
             cls.GCP_ACCESS = True
 
-            # Removes test folder if it is already there
-            StorageFolder("gs://aries_test/copy_test/").delete()
-            StorageFile("gs://aries_test/copy_test").delete()
-            StorageFile("gs://aries_test/abc.txt").delete()
-            StorageFile("gs://aries_test/new_file.txt").delete()
-            StorageFile("gs://aries_test/moved_file.txt").delete()
-            StorageFile("gs://aries_test/local_upload.txt").delete()
+            # Removes test folder and files if they are already there
+            leftovers = [
+                StorageFolder("gs://aries_test/copy_test/"),
+                StorageFile("gs://aries_test/copy_test"),
+                StorageFile("gs://aries_test/abc.txt"),
+                StorageFile("gs://aries_test/new_file.txt"),
+                StorageFile("gs://aries_test/moved_file.txt"),
+                StorageFile("gs://aries_test/local_upload.txt"),
+            ]
+            with ThreadPoolExecutor(max_workers=len(leftovers)) as executor:
+                list(executor.map(lambda obj: obj.delete(), leftovers))
         except Exception as ex:
             print("%s: %s" % (type(ex), str(ex)))
             traceback.print_exc()
@@ -50,7 +60,12 @@ class TestGCStorage(AriesTest):
         # Skip test if GCP_ACCESS is not True.
         if not self.GCP_ACCESS:
             self.skipTest("GCP Credentials not found.")
-        time.sleep(1)
+        # Keep at least 1 second between tests, as the same objects are modified by different tests.
+        # The credentials and the client are initialized once in setUpClass() and shared by the tests.
+        time.sleep(max(0, 1 - (time.monotonic() - TestGCStorage.LAST_FINISHED)))
+
+    def tearDown(self):
+        TestGCStorage.LAST_FINISHED = time.monotonic()
 
     def test_parse_uri(self):
         """Tests parsing GCS URI
@@ -71,6 +86,10 @@ class TestGCStorage(AriesTest):
         gs_obj = gs.GSPrefix("gs://aries_test/test_folder/")
         self.assertEqual(gs_obj.bucket_name, "aries_test")
         self.assertEqual(gs_obj.prefix, "test_folder/")
+        # Object name with "?" and "#"
+        gs_obj = gs.GSPrefix("gs://aries_test/test_folder/a?b#c")
+        self.assertEqual(gs_obj.bucket_name, "aries_test")
+        self.assertEqual(gs_obj.prefix, "test_folder/a?b#c")
         # Folder without "/"
         gs_obj = StorageFolder("gs://aries_test/test_folder")
         self.assertEqual(gs_obj.uri, "gs://aries_test/test_folder/")
@@ -264,6 +283,24 @@ class TestGCStorage(AriesTest):
         self.assertEqual(gs_file.read(), b'This is a local test file.\n')
         gs_file.delete()
 
+    def test_upload_many(self):
+        gs_folder = gs.GSFolder("gs://aries_test/copy_test/upload_many/")
+        fixtures = os.path.join(os.path.dirname(__file__), "fixtures")
+        local_files = [os.path.join(fixtures, "test_file.txt"), os.path.join(fixtures, "test.md")]
+        try:
+            uris = gs_folder.upload_many(local_files)
+            self.assertEqual(uris, [
+                "gs://aries_test/copy_test/upload_many/test_file.txt",
+                "gs://aries_test/copy_test/upload_many/test.md",
+            ])
+            self.assertEqual(StorageFile(uris[0]).read(), b'This is a local test file.\n')
+            self.assertEqual(sorted(gs_folder.file_paths), sorted(uris))
+        finally:
+            StorageFolder("gs://aries_test/copy_test/").delete()
+        # Files with the same basename would overwrite each other.
+        with self.assertRaises(ValueError):
+            gs_folder.upload_many([local_files[0], os.path.join(fixtures, "..", "fixtures", "test_file.txt")])
+
     def test_create_and_move_blob(self):
         gs_file = StorageFile("gs://aries_test/new_file.txt")
         self.assertFalse(gs_file.blob.exists())
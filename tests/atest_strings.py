@@ -5,6 +5,7 @@ import logging
 
 import os
 import sys
+from unittest import mock
 aries_parent = os.path.join(os.path.dirname(__file__), "..", "..")
 if aries_parent not in sys.path:
     sys.path.append(aries_parent)
@@ -53,6 +54,9 @@ class TestAString(AriesTest):
         # Test endswith() method
         self.assertTrue(AString("test string").endswith("ing"), "endswith() Error.")
 
+        # Dunder attributes are not wrapped
+        self.assertEqual(AString("test string").__class__, AString)
+
     def test_append_strings(self):
         """Tests appending strings
         """
@@ -68,6 +72,25 @@ class TestAString(AriesTest):
             str(today.day).zfill(2)
         ))
 
+    def test_append_current_datetime(self):
+        """Tests appending the current date and time, which should not be fixed when the module is imported.
+        """
+        class FixedDatetime(datetime.datetime):
+            fixed_now = None
+
+            @classmethod
+            def now(cls, tz=None):
+                return cls.fixed_now
+
+        a_string = AString("test")
+        with mock.patch("datetime.datetime", FixedDatetime):
+            FixedDatetime.fixed_now = FixedDatetime(2001, 2, 3, 4, 5, 6)
+            self.assertEqual(a_string.append_datetime(), "test_20010203_040506")
+            self.assertEqual(a_string.append_today("%Y-%H"), "test_2001-04")
+            FixedDatetime.fixed_now = FixedDatetime(2002, 3, 4, 5, 6, 7)
+            self.assertEqual(a_string.append_datetime(), "test_20020304_050607")
+            self.assertEqual(a_string.append_today("%Y-%H"), "test_2002-05")
+
     def test_prepend_strings(self):
         """Tests prepending strings
         """
@@ -1,9 +1,13 @@
 """Contains tests for the web module.
 """
 import datetime
+import http.server
+import json
 import logging
 import os
 import sys
+import tempfile
+import threading
 aries_parent = os.path.join(os.path.dirname(__file__), "..", "..")
 if aries_parent not in sys.path:
     sys.path.append(aries_parent)
@@ -12,12 +16,106 @@ from Aries import web
 logger = logging.getLogger(__name__)
 
 
+class RangeRequestHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the bytes in the "content" attribute of the server, supporting HEAD and range requests.
+    HEAD requests are dropped without response if the "drop_head" attribute of the server is True.
+    The Range header is ignored if the "ignore_range" attribute of the server is True.
+    """
+    def do_HEAD(self):
+        if self.server.drop_head:
+            self.close_connection = True
+            return
+        self.send_response(200)
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("Content-Length", str(len(self.server.content)))
+        self.end_headers()
+
+    def do_GET(self):
+        content = self.server.content
+        range_header = self.headers.get("Range")
+        if range_header:
+            self.server.range_requests += 1
+        if range_header and not self.server.ignore_range:
+            start, end = range_header.split("=", 1)[1].split("-")
+            content = content[int(start):int(end) + 1]
+            self.send_response(206)
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class HeaderEchoHandler(http.server.BaseHTTPRequestHandler):
+    """Responds the headers of the request as a JSON object.
+    """
+    def do_GET(self):
+        content = json.dumps(dict(self.headers.items())).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, *args):
+        pass
+
+
+class ETagHandler(http.server.BaseHTTPRequestHandler):
+    """Serves the bytes in the "content" attribute of the server with an ETag.
+    Responds 304 Not Modified to the requests with the same ETag in If-None-Match header.
+    The number of responses with the full content is counted in the "full_responses" attribute of the server.
+    """
+    ETAG = '"v1"'
+
+    def do_GET(self):
+        if self.headers.get("If-None-Match") == self.ETAG:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.server.full_responses += 1
+        self.send_response(200)
+        self.send_header("ETag", self.ETAG)
+        self.send_header("Content-Length", str(len(self.server.content)))
+        self.end_headers()
+        self.wfile.write(self.server.content)
+
+    def log_message(self, *args):
+        pass
+
+
 class TestWeb(AriesTest):
     def test_web_api_get(self):
         api = web.WebAPI("https://api.weather.gov/")
         res = api.get_json("")
         self.assertEqual(res.get("status"), "OK")
 
+    def test_web_api_headers(self):
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), HeaderEchoHandler)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            with web.WebAPI("http://127.0.0.1:%s/" % server.server_port) as api:
+                # Headers can be added by add_header() or by modifying the headers attribute.
+                api.add_header(Authorization="Bearer xyz")
+                api.headers["X-Token"] = "abc"
+                for headers in [api.get("echo").json(), api.get_json("echo")]:
+                    self.assertEqual(headers.get("Authorization"), "Bearer xyz")
+                    self.assertEqual(headers.get("X-Token"), "abc")
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_append_query_string(self):
+        url = web.WebAPI.append_query_string("https://example.com/api", q="a b", ids=[1, 2])
+        self.assertEqual(url, "https://example.com/api?q=a+b&ids=1&ids=2")
+        url = web.WebAPI.append_query_string("https://example.com/api?key=1", q="a&b")
+        self.assertEqual(url, "https://example.com/api?key=1&q=a%26b")
+        self.assertEqual(web.WebAPI.append_query_string("https://example.com/api"), "https://example.com/api")
+
     def test_download(self):
         file_path = os.path.join(os.path.dirname(__file__), "test_download")
         if os.path.exists(file_path):
@@ -26,6 +124,76 @@ class TestWeb(AriesTest):
         self.assertTrue(os.path.exists(file_path))
         os.remove(file_path)
 
+    def assert_local_download(self, drop_head=False, ignore_range=False):
+        """Downloads the content of a local HTTP server with the range threshold lowered to 1 KB.
+
+        Returns: The number of range requests received by the server.
+        """
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), RangeRequestHandler)
+        server.content = os.urandom(10 * 1024 + 7)
+        server.drop_head = drop_head
+        server.ignore_range = ignore_range
+        server.range_requests = 0
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        threshold = web.DOWNLOAD_RANGE_THRESHOLD
+        web.DOWNLOAD_RANGE_THRESHOLD = 1024
+        try:
+            url = "http://127.0.0.1:%s/file" % server.server_port
+            with tempfile.TemporaryDirectory() as temp_dir:
+                file_path = os.path.join(temp_dir, "download")
+                web.download(url, file_path)
+                with open(file_path, "rb") as f:
+                    self.assertEqual(f.read(), server.content)
+        finally:
+            web.DOWNLOAD_RANGE_THRESHOLD = threshold
+            server.shutdown()
+            server.server_close()
+        return server.range_requests
+
+    def test_download_ranges(self):
+        self.assertEqual(self.assert_local_download(drop_head=False), web.DOWNLOAD_WORKERS)
+
+    def test_download_fallback(self):
+        # The file is downloaded with a single GET request if the HEAD request fails.
+        self.assertEqual(self.assert_local_download(drop_head=True), 0)
+        # The file is downloaded again with a single GET request if the range requests are not supported.
+        self.assertGreater(self.assert_local_download(ignore_range=True), 0)
+
+    def test_html_cache(self):
+        server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), ETagHandler)
+        with open(os.path.join(os.path.dirname(__file__), "fixtures", "nested_table.html"), "rb") as f:
+            server.content = f.read()
+        server.full_responses = 0
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            url = "http://127.0.0.1:%s/tables.html" % server.server_port
+            tables = web.HTML(url).get_tables()
+            self.assertEqual(len(tables), 2)
+            # The page is not downloaded again when it is parsed or read again.
+            self.assertEqual(web.HTML(url).get_tables(), tables)
+            self.assertEqual(web.HTML(url).content, server.content)
+            self.assertEqual(server.full_responses, 1)
+        finally:
+            server.shutdown()
+            server.server_close()
+
+    def test_get_nested_html_tables(self):
+        file_path = os.path.join(os.path.dirname(__file__), "fixtures", "nested_table.html")
+        tables = web.HTML(file_path).get_tables()
+        self.assertEqual(len(tables), 2)
+        outer, inner = tables
+        # Rows of the nested table are also included in the outer table, in document order.
+        # The cells of the nested table are also included in the outer row containing the nested table.
+        self.assertEqual(outer["headers"], [["Name", "Details"], ["Key"], ["Key"]])
+        self.assertEqual(len(outer["data"]), 2)
+        self.assertEqual(outer["data"][0][0], "Outer")
+        self.assertEqual(outer["data"][0][-1], "Inner")
+        self.assertEqual(outer["data"][1], ["Inner"])
+        self.assertEqual(inner["headers"], [["Key"]])
+        self.assertEqual(inner["data"], [["Inner"]])
+
     def test_get_html_table(self):
         url = "https://en.wikipedia.org/wiki/List_of_file_signatures"
         tables = web.HTML(url).get_tables()
@@ -1,12 +1,26 @@
+import os
+import json
+import shutil
 import requests
+import threading
 import logging
 import contextlib
-from io import BytesIO
+import http.client
+from collections import OrderedDict
 from .storage import StorageObject
 from lxml import etree
 from urllib import request
+from urllib.parse import urlencode
+from concurrent.futures import ThreadPoolExecutor
 logger = logging.getLogger(__name__)
 
+# The number of bytes to be read from the response and written to the file at a time in download().
+DOWNLOAD_BLOCK_SIZE = 1 << 20
+# Files larger than this number of bytes are downloaded in parts concurrently, if the server supports it.
+DOWNLOAD_RANGE_THRESHOLD = 16 * 1024 * 1024
+# The number of parts to be downloaded concurrently.
+DOWNLOAD_WORKERS = 8
+
 
 class WebAPI:
     """Provides method to access web API.
@@ -14,12 +28,20 @@ class WebAPI:
     This class uses python requests package.
     See https://2.python-requests.org/en/master/user/advanced/#request-and-response-objects
 
+    All requests are sent with the same requests.Session, so that the connections are reused.
+    Use close() or the with statement to release the connections:
+        with WebAPI("https://example.com/") as api:
+            api.get_json("path")
+
     Attributes:
         base_url: The base URL for all API endpoint.
         If base_url is specified, relative URL can be used to make requests.
         Relative URL will be appended to base URL when making the requests.
     
     """
+    # Headers for the requests expecting JSON response, see get_json() and post_json().
+    JSON_HEADERS = {"Accept": "application/json"}
+
     def __init__(self, base_url="", **kwargs):
         """Initializes API.
 
@@ -35,6 +57,18 @@ class WebAPI:
             self.base_url = base_url
         else:
             raise ValueError("Base URL should start with http:// or https://")
+        self.session = requests.Session()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        """Closes the session and the connections in it.
+        """
+        self.session.close()
 
     def add_header(self, **kwargs):
         """Adds a header to be used in all future HTTP requests
@@ -62,13 +96,12 @@ class WebAPI:
         """
         url = self.build_url(url)
         method = str(method).lower()
-        if not hasattr(requests, method):
+        if method not in ["get", "options", "head", "post", "put", "patch", "delete"]:
             raise ValueError("Invalid method: %s" % method)
-        request_func = getattr(requests, method)
         headers = kwargs.get("headers", {})
         headers.update(self.headers)
         kwargs["headers"] = headers
-        response = request_func(url, **kwargs)
+        response = self.session.request(method, url, **kwargs)
         return response
 
     def get(self, url, **kwargs):
@@ -84,31 +117,46 @@ class WebAPI:
         """
         url = self.build_url(url, **kwargs)
         logger.debug("Requesting data from %s" % url)
-        response = requests.get(url, headers=self.headers)
-        logger.debug("Response code: %s" % response.status_code)
-        if response.status_code != 200:
-            logger.debug(response.content)
-        return response
+        return self.__log_response(self.session.get(url, headers=self.headers))
 
     def get_json(self, url, **kwargs):
-        return self.get(url, **kwargs).json()
+        url = self.build_url(url, **kwargs)
+        logger.debug("Requesting data from %s" % url)
+        response = self.__log_response(self.session.get(url, headers={**self.JSON_HEADERS, **self.headers}))
+        return self.__parse_json(response)
 
     def post(self, url, data, **kwargs):
         url = self.build_url(url, **kwargs)
         logger.debug("Posting data to %s" % url)
-        response = requests.post(url, json=data, headers=self.headers)
+        return self.__log_response(self.session.post(url, json=data, headers=self.headers))
+
+    def post_json(self, url, data, **kwargs):
+        url = self.build_url(url, **kwargs)
+        logger.debug("Posting data to %s" % url)
+        response = self.__log_response(
+            self.session.post(url, json=data, headers={**self.JSON_HEADERS, **self.headers})
+        )
+        return self.__parse_json(response)
+
+    @staticmethod
+    def __log_response(response):
         logger.debug("Response code: %s" % response.status_code)
         if response.status_code != 200:
             logger.debug(response.content)
         return response
 
-    def post_json(self, url, data, **kwargs):
-        return self.post(url, data, **kwargs).json()
+    @staticmethod
+    def __parse_json(response):
+        """Parses the response body as JSON.
+        The raw bytes are passed to json.loads(), which detects the UTF-8/16/32 encoding by itself.
+        Unlike response.json(), this does not decode the body to str and does not guess the charset.
+        """
+        return json.loads(response.content)
 
     def delete(self, url, **kwargs):
         url = self.build_url(url, **kwargs)
         logger.debug("Deleting data from %s" % url)
-        response = requests.delete(url, headers=self.headers)
+        response = self.session.delete(url, headers=self.headers)
         return response
 
     def build_url(self, url, **kwargs):
@@ -126,15 +174,14 @@ class WebAPI:
         url = url
         if not (url.startswith("http://") or url.startswith("https://")):
             url = "%s%s" % (self.base_url, url)
-        query_dict = self.kwargs.copy()
-        query_dict.update(kwargs)
-        return self.append_query_string(url, **query_dict)
+        return self.append_query_string(url, **{**self.kwargs, **kwargs})
     
     @staticmethod
     def append_query_string(url, **kwargs):
         """Appends query string to a URL
 
         Query string is specified as keyword arguments.
+        The keys and values are URL-encoded. A list value is encoded as multiple parameters with the same key.
         
         Args:
             url (str): URL
@@ -142,17 +189,34 @@ class WebAPI:
         Returns:
             str: URL with query string.
         """
-        for key, val in kwargs.items():
-            if "?" not in url:
-                url += "?"
-            if isinstance(val, list):
-                url += "".join(["&%s=%s" % (key, v) for v in val])
-            else:
-                url += "&%s=%s" % (key, val)
+        query_string = urlencode(kwargs, doseq=True)
+        if not query_string:
+            return url
+        if "?" not in url:
+            url += "?"
+        elif not url.endswith("?") and not url.endswith("&"):
+            url += "&"
+        url += query_string
         return url
 
 
 class HTML:
+    # The number of bytes to be fed into the parser at a time when parsing the HTML as a stream.
+    CHUNK_SIZE = 1 << 16
+    # Stores the HTML parser of each thread, see get_parser().
+    parser_data = threading.local()
+    # The maximum total number of bytes of the web pages in the cache.
+    CACHE_SIZE = 32 * 1024 * 1024
+    # Web pages larger than this number of bytes are not cached.
+    CACHE_PAGE_SIZE = 4 * 1024 * 1024
+    # Caches the web pages read by read() or parsed by etree, in the order of last use.
+    # Only pages with ETag or Last-Modified header are cached, see __iter_chunks().
+    # key: URL
+    # value: a 3-tuple (ETag, Last-Modified, content)
+    cache = OrderedDict()
+    cache_bytes = 0
+    cache_lock = threading.Lock()
+
     def __init__(self, uri):
         self.uri = uri
         self.__etree = None
@@ -161,8 +225,7 @@ class HTML:
     def read(self):
         obj = StorageObject(self.uri)
         if obj.scheme in ["http", "https"]:
-            r = requests.get(self.uri)
-            return r.content
+            return b"".join(self.__iter_chunks())
         with open(self.uri, 'r') as f:
             return f.read()
 
@@ -172,22 +235,120 @@ class HTML:
             self.__content = self.read()
         return self.__content
 
+    @classmethod
+    def __get_cached(cls, url):
+        with cls.cache_lock:
+            cached = cls.cache.get(url)
+            if cached:
+                cls.cache.move_to_end(url)
+            return cached
+
+    @classmethod
+    def __set_cached(cls, url, etag, last_modified, content):
+        """Caches the content of a web page, or removes the page from the cache if content is None.
+        The least recently used pages are removed if the cache is larger than CACHE_SIZE.
+        """
+        with cls.cache_lock:
+            cached = cls.cache.pop(url, None)
+            if cached:
+                cls.cache_bytes -= len(cached[2])
+            if content is None:
+                return
+            cls.cache[url] = (etag, last_modified, content)
+            cls.cache_bytes += len(content)
+            while cls.cache_bytes > cls.CACHE_SIZE:
+                _, (_, _, removed) = cls.cache.popitem(last=False)
+                cls.cache_bytes -= len(removed)
+
+    def __iter_chunks(self):
+        """Iterates through the HTML document as chunks of bytes, without reading all of it into memory.
+
+        For a web page in the cache, the ETag and Last-Modified headers are sent as conditional request headers,
+        so that the body is not downloaded again if the server responds 304 Not Modified.
+        A web page is cached only if its size is not larger than CACHE_PAGE_SIZE.
+        """
+        obj = StorageObject(self.uri)
+        if obj.scheme in ["http", "https"]:
+            cached = self.__get_cached(self.uri)
+            headers = {}
+            if cached:
+                etag, last_modified, content = cached
+                if etag:
+                    headers["If-None-Match"] = etag
+                if last_modified:
+                    headers["If-Modified-Since"] = last_modified
+            with requests.get(self.uri, headers=headers, stream=True) as r:
+                if cached and r.status_code == 304:
+                    yield content
+                    return
+                etag = r.headers.get("ETag")
+                last_modified = r.headers.get("Last-Modified")
+                # Keeps the chunks for caching the page, None if the page will not be cached.
+                chunks = [] if r.status_code == 200 and (etag or last_modified) else None
+                size = 0
+                for chunk in r.iter_content(self.CHUNK_SIZE):
+                    if chunks is not None:
+                        size += len(chunk)
+                        chunks.append(chunk)
+                        if size > self.CACHE_PAGE_SIZE:
+                            chunks = None
+                    yield chunk
+            self.__set_cached(self.uri, etag, last_modified, b"".join(chunks) if chunks is not None else None)
+            return
+        with open(obj.path, 'rb') as f:
+            while True:
+                chunk = f.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                yield chunk
+
+    @classmethod
+    def get_parser(cls):
+        """Gets the lxml HTMLParser of the current thread.
+        The parser is reset when close() is called after parsing a document,
+        so that it can be reused for the next document in the same thread.
+        Parsers are not thread-safe, each thread has its own parser.
+        """
+        parser = getattr(cls.parser_data, "parser", None)
+        if parser is None:
+            parser = etree.HTMLParser()
+            cls.parser_data.parser = parser
+        return parser
+
     @property
     def etree(self):
+        """The parsed HTML document as an lxml ElementTree.
+        If the content has not been read, the document is parsed while it is being downloaded.
+        """
         if not self.__etree:
-            self.__etree = etree.parse(BytesIO(self.content), etree.HTMLParser())
+            parser = self.get_parser()
+            try:
+                if self.__content:
+                    parser.feed(self.__content)
+                else:
+                    for chunk in self.__iter_chunks():
+                        parser.feed(chunk)
+            except BaseException:
+                # Discard the partially fed document so that the parser can be reused.
+                try:
+                    parser.close()
+                except etree.XMLSyntaxError:
+                    pass
+                raise
+            self.__etree = etree.ElementTree(parser.close())
         return self.__etree
 
     @staticmethod
     def __tags_to_list(parent, tag):
-        elements = parent.findall(".//%s" % tag)
-        if not elements:
-            return None
-        results = []
-        for element in elements:
-            text = element.text if element.text else ""
-            results.append(text + ''.join(etree.tostring(e).decode() for e in element))
-        return results
+        """Gets the inner HTML of each element with the tag under parent.
+        The inner HTML is the text of the element followed by each child serialized (to str) with its tail.
+
+        Returns: A list of str, or None if there is no such element.
+        """
+        return [
+            (element.text or "") + "".join(etree.tostring(e, encoding="unicode") for e in element)
+            for element in parent.iterfind(".//%s" % tag)
+        ] or None
 
     @staticmethod
     def __append_data(to_list, parent, tag):
@@ -202,27 +363,40 @@ class HTML:
             list: A list of dictionary, each contain data from a table in the web page.
             Each dictionary has two keys: "headers" and "data".
             Both "headers" and "data" are 2D lists.
+
+        Rows in a nested table are included in the nested table and in all the tables containing it.
         """
-        html = self.etree
-        html_tables = html.findall('.//table')
         data_tables = []
-        
-        for html_table in html_tables:
-            table = {
-                "headers": [],
-                "data": []
-            }
-            rows = html_table.findall(".//tr")
-            for row in rows:
-                self.__append_data(table["headers"], row, "th")
-                self.__append_data(table["data"], row, "td")
-            data_tables.append(table)
+        # The tables containing the current element, the innermost table is the last one.
+        table_stack = []
+        # Walk through the tables and rows in a single pass, in document order.
+        for event, element in etree.iterwalk(self.etree, events=("start", "end"), tag=("table", "tr")):
+            if element.tag == "table":
+                if event == "start":
+                    table = {
+                        "headers": [],
+                        "data": []
+                    }
+                    data_tables.append(table)
+                    table_stack.append(table)
+                else:
+                    table_stack.pop()
+            elif event == "start":
+                # Rows are added to the tables in the order of the start tags, i.e. document order.
+                for table in table_stack:
+                    self.__append_data(table["headers"], element, "th")
+                    self.__append_data(table["data"], element, "td")
         return data_tables
 
 
 def download(url, file_path):
     """Downloads a file from a URL response.
 
+    If the server accepts range requests and the file is larger than DOWNLOAD_RANGE_THRESHOLD,
+    the file will be downloaded in DOWNLOAD_WORKERS parts concurrently.
+    The parts are written with os.pwrite(), which is not available on all platforms (e.g. Windows).
+    The file is downloaded with a single request if the server does not respond to the range requests as expected.
+
     Args:
         url (str): The URL of the file to be downloaded.
         file_path (str): The path to store the file.
@@ -230,13 +404,99 @@ def download(url, file_path):
     Returns: None
 
     """
-    url_response = request.urlopen(url)
-    with open(file_path, 'wb') as out_file:
-        with contextlib.closing(url_response) as fp:
-            logger.debug("Downloading data from %s" % url)
-            block_size = 1 << 16
-            while True:
-                block = fp.read(block_size)
-                if not block:
-                    break
-                out_file.write(block)
+    content_length = _get_range_length(url) if hasattr(os, "pwrite") else None
+    if content_length and content_length >= DOWNLOAD_RANGE_THRESHOLD:
+        try:
+            _download_ranges(url, file_path, content_length)
+            return
+        except _RangeNotSupported as ex:
+            # The HEAD response is only advisory.
+            logger.debug("Failed to download %s in parts: %s" % (url, ex))
+    with contextlib.closing(request.urlopen(url)) as url_response, open(file_path, 'wb') as out_file:
+        logger.debug("Downloading data from %s" % url)
+        content_length = url_response.headers.get("Content-Length")
+        if content_length and content_length.isdigit():
+            _allocate(out_file, int(content_length))
+        try:
+            shutil.copyfileobj(url_response, out_file, DOWNLOAD_BLOCK_SIZE)
+        finally:
+            # Remove the allocated space that is not used,
+            # in case the response is shorter than expected or the download fails.
+            out_file.truncate()
+
+
+class _RangeNotSupported(Exception):
+    """Indicates that the server does not respond to a range request with partial content.
+    """
+
+
+def _get_range_length(url):
+    """Sends a HEAD request to get the length of the file, if the server accepts range requests.
+
+    Returns: The number of bytes in the file, or None if range requests are not supported.
+    """
+    try:
+        with contextlib.closing(request.urlopen(request.Request(url, method="HEAD"))) as response:
+            headers = response.headers
+    except (OSError, http.client.HTTPException, ValueError) as ex:
+        # URLError is a subclass of OSError.
+        # Errors raised when reading the response (e.g. RemoteDisconnected) are not wrapped by urllib.
+        logger.debug("Failed to send HEAD request to %s: %s" % (url, ex))
+        return None
+    content_length = headers.get("Content-Length")
+    if headers.get("Accept-Ranges") != "bytes" or not content_length or not content_length.isdigit():
+        return None
+    return int(content_length)
+
+
+def _allocate(out_file, size):
+    """Allocates the disk space for a file at once to avoid fragmentation.
+    """
+    if not hasattr(os, "posix_fallocate"):
+        return
+    try:
+        os.posix_fallocate(out_file.fileno(), 0, size)
+    except OSError as ex:
+        logger.debug("Failed to allocate disk space for %s: %s" % (out_file.name, ex))
+
+
+def _download_range(url, fd, start, end):
+    """Downloads the bytes from position start to position end (inclusive) and writes them to the same position in fd.
+    """
+    range_request = request.Request(url, headers={"Range": "bytes=%d-%d" % (start, end)})
+    with contextlib.closing(request.urlopen(range_request)) as response:
+        if response.status != 206:
+            raise _RangeNotSupported("Server does not return partial content for range request: %s" % url)
+        offset = start
+        while True:
+            block = response.read(DOWNLOAD_BLOCK_SIZE)
+            if not block:
+                break
+            offset += os.pwrite(fd, block, offset)
+    if offset != end + 1:
+        raise ValueError("Expect %d bytes but received %d bytes from %s" % (end + 1 - start, offset - start, url))
+
+
+def _download_ranges(url, file_path, content_length):
+    """Downloads a file in DOWNLOAD_WORKERS parts concurrently using range requests.
+    """
+    logger.debug("Downloading data from %s in %d parts" % (url, DOWNLOAD_WORKERS))
+    part_size = -(-content_length // DOWNLOAD_WORKERS)
+    try:
+        with open(file_path, 'wb') as out_file:
+            _allocate(out_file, content_length)
+            out_file.truncate(content_length)
+            fd = out_file.fileno()
+            with ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS) as executor:
+                futures = [
+                    executor.submit(_download_range, url, fd, start, min(start + part_size, content_length) - 1)
+                    for start in range(0, content_length, part_size)
+                ]
+                for future in futures:
+                    future.result()
+    except BaseException:
+        # The parts are written at their positions in a file of full size.
+        # Remove the file so that a failed download does not look complete.
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise